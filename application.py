@@ -1,57 +1,117 @@
 #!/usr/bin/env python
+from __future__ import annotations
 
 import asyncio
 import dataclasses
 import json
 import os
+from typing import TYPE_CHECKING, Optional, TextIO
 
-import cattrs
 import websockets
 
-from bot import Bot
-from game_message import GameMessage
+if TYPE_CHECKING:
+    from bot import Bot
+    from planner_pool import InterceptPlan, PlannerPool
+    from profiling import TickProfiler
 
 
 async def run():
     uri = "ws://127.0.0.1:8765"
 
     async with websockets.connect(uri, max_size=None) as websocket:
-        bot = Bot()
         if "TOKEN" in os.environ:
             await websocket.send(json.dumps({"type": "REGISTER", "token": os.environ["TOKEN"]}))
         else:
             await websocket.send(json.dumps({"type": "REGISTER", "teamName": "MyPythonicBot"}))
 
-        await game_loop(websocket=websocket, bot=bot)
+        # The bot, NumPy and cattrs are only imported once REGISTER is sent, while the server prepares the first tick
+        from bot import Bot
+        from profiling import TickProfiler
+
+        bot = Bot()
+        profiler = TickProfiler.from_env()
+
+        # With PLANNER_WORKERS set, intercepts and scores are computed in worker processes off the event loop.
+        # Plans later than PLANNER_BUDGET_MS are dropped, leaving the rest of the tick to compute them in-process.
+        planner: Optional[PlannerPool] = None
+        if int(os.environ.get("PLANNER_WORKERS", 0)):
+            from planner_pool import PlannerPool
+            planner = PlannerPool(int(os.environ["PLANNER_WORKERS"]),
+                                  budget=float(os.environ.get("PLANNER_BUDGET_MS", 40)) / 1000)
+
+        try:
+            if "RECORD_GAME" in os.environ:
+                # Raw tick messages can be replayed later with strategy_harness.py --replay
+                with open(os.environ["RECORD_GAME"], "w") as record_file:
+                    await game_loop(websocket=websocket, bot=bot, profiler=profiler, planner=planner,
+                                    record_file=record_file)
+            else:
+                await game_loop(websocket=websocket, bot=bot, profiler=profiler, planner=planner)
+        finally:
+            if planner is not None:
+                planner.close()
+
+
+async def game_loop(websocket: websockets.WebSocketServerProtocol, bot: Bot, profiler: TickProfiler,
+                    planner: Optional[PlannerPool] = None, record_file: Optional[TextIO] = None):
+    import cattrs
 
+    from game_message import GameMessage
 
-async def game_loop(websocket: websockets.WebSocketServerProtocol, bot: Bot):
     while True:
         try:
             message = await websocket.recv()
         except websockets.exceptions.ConnectionClosed:
             # Connection is closed, the game is probably over
             print("Websocket was closed.")
+            profiler.flush()
+            profiler.write_dumps()
             break
 
-        game_message: GameMessage = cattrs.structure(json.loads(message), GameMessage)
-        #print(f"Playing tick {game_message.tick}")
-        if game_message.tick == 999:
-            print(f"Game over! Score: {game_message.score}")
-            
-
-        if game_message.lastTickErrors:
-            print(f'Errors during last tick : {game_message.lastTickErrors}')
-
-        payload = {
-            "type": "COMMAND",
-            "tick": game_message.tick,
-            "actions": [dataclasses.asdict(action) for action in bot.get_next_move(game_message)]
-        }
+        data = json.loads(message)
+        if data.get("type") == "PROFILE":
+            try:
+                profiler.configure(mode=data.get("mode", ""), first_tick=data.get("firstTick", 0),
+                                   last_tick=data.get("lastTick"), every=data.get("every", 1),
+                                   window=data.get("window", 100))
+            except ValueError as error:
+                print(f"Ignoring profiling control message: {error}")
+            profiler.write_dumps()
+            continue
+
+        if record_file is not None:
+            record_file.write(message.strip() + "\n")
+
+        with profiler.profile_tick(data["tick"]):
+            game_message: GameMessage = cattrs.structure(data, GameMessage)
+            #print(f"Playing tick {game_message.tick}")
+            if game_message.tick == 999:
+                print(f"Game over! Score: {game_message.score}")
+
+
+            if game_message.lastTickErrors:
+                print(f'Errors during last tick : {game_message.lastTickErrors}')
+
+            plan: Optional[InterceptPlan] = None
+            if planner is not None:
+                if game_message.cannon.cooldown == 0:
+                    plan = await planner.plan(game_message)
+                else:
+                    planner.speculate(game_message)
+                if planner.broken:
+                    planner = None
+
+            payload = {
+                "type": "COMMAND",
+                "tick": game_message.tick,
+                "actions": [dataclasses.asdict(action) for action in bot.get_next_move(game_message, plan)]
+            }
 
         #print(json.dumps(payload))
 
         await websocket.send(json.dumps(payload))
+        # Dumps of a finished profiling window are written once the command is out, outside the tick's deadline
+        profiler.write_dumps()
 
 
 if __name__ == "__main__":
@@ -1,50 +1,83 @@
-from typing import Optional
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Optional
 
 from game_message import *
 from actions import *
-from math import sqrt, cos, sin, radians
-import copy
+from math import sqrt, cos, sin, radians, atan2, degrees, hypot
+import dataclasses
 import numpy as np
 from overengineered_weight_calculator import VectorField, WeightCalculator
+from intercept_cache import InterceptCache
+from history import BoundedHistory
+from uncertainty_model import UncertaintyEngine
+from reach_map import ReachMap
+
+if TYPE_CHECKING:
+    # Only the application's planner mode needs the process pool module
+    from planner_pool import InterceptPlan
 
 
 class Collision:
+    # Only ids are kept so that old ticks' Projectile/Meteor objects can be freed
+    __slots__ = ("rocket_id", "meteor_id", "time")
+
     def __init__(self, rocket: Projectile, meteor: Meteor, time: float):
-        self.rocket: Projectile = rocket
-        self.meteor: Meteor = meteor
+        self.rocket_id: str = rocket.id
+        self.meteor_id: str = meteor.id
         self.time: float = time
 
 
 class Shot:
+    __slots__ = ("rocket_id", "target_id", "target_type", "time", "reason")
+
     def __init__(self, id: Projectile, target: Meteor, time: float, reason: str):
         self.rocket_id: int = id
-        self.target: Meteor = target
+        self.target_id: str = target.id
+        self.target_type: MeteorType = target.meteorType
         self.time: float = time
         self.reason: str = reason
 
 
 class Bot:
-    def __init__(self):
+    def __init__(self, history_size: int = 256, field_cache_size: int = 4096):
+        self.history_size: int = history_size
+        self.field_cache_size: int = field_cache_size
+        self.min_hit_probability: float = 0.5
+        self.games_played: int = 0
+        self.reset()
+        print("Initializing VAUL domination...")
+
+    def reset(self) -> None:
+        # Drops all per-game state so that the same Bot can play another game
         self.vector_field: Optional[VectorField] = None
         self.weight_calculator: Optional[WeightCalculator] = None
+        self.reach_map: Optional[ReachMap] = None
         self.game_bounds: list[int] = []
+        self.last_tick: int = -1
         self.target_queue: list[Meteor] = []
         self.pending_collisions: list[Collision] = []
-        self.actual_collisions: list[Collision] = []
-        self.shot_rockets: list[Shot] = []
+        self.actual_collisions: BoundedHistory[Collision] = BoundedHistory(self.history_size)
+        self.shot_rockets: BoundedHistory[Shot] = BoundedHistory(self.history_size)
+        self.intercept_cache: InterceptCache = InterceptCache()
+        self.uncertainty_engine: UncertaintyEngine = UncertaintyEngine()
         self.reason = ""
-        self.large_meteor_uncertainty: float = 0.3
-        self.medium_meteor_uncertainty: float = 0.6
-        self.small_meteor_uncertainty: float = 1.0
-        print("Initializing VAUL domination...")
 
-    def get_next_move(self, game_message: GameMessage) -> list[LookAtAction | RotateAction | ShootAction]:
+    def get_next_move(self, game_message: GameMessage,
+                      plan: Optional[InterceptPlan] = None) -> list[LookAtAction | RotateAction | ShootAction]:
         # print(f"Score: {game_message.score}")
 
+        if game_message.tick < self.last_tick:
+            self.games_played += 1
+            self.reset()
+        self.last_tick = game_message.tick
+
         if game_message.tick == 999:
-            print(f"Shot {len(self.shot_rockets)} rockets")
-            print(f"Hit {len(self.actual_collisions)} meteors")
+            print(f"Shot {self.shot_rockets.total} rockets")
+            print(f"Hit {self.actual_collisions.total} meteors")
             self.print_missed_shots()
+            print(self.intercept_cache.report())
+            print(self.uncertainty_engine.report())
 
         if not self.game_bounds:
             self.game_bounds = [
@@ -56,9 +89,17 @@ class Bot:
         if self.vector_field is None:
             cannon_position = (game_message.cannon.position.x, game_message.cannon.position.y)
             edge_point = (game_message.constants.world.width, game_message.constants.world.height)
-            self.vector_field = VectorField(cannon_position=cannon_position, edge_point=edge_point)
+            self.vector_field = VectorField(cannon_position=cannon_position, edge_point=edge_point,
+                                            cache_size=self.field_cache_size)
             self.weight_calculator = WeightCalculator(self.vector_field)
 
+        if self.reach_map is None:
+            self.reach_map = ReachMap(cannon_position=(game_message.cannon.position.x, game_message.cannon.position.y),
+                                      rocket_speed=game_message.constants.rockets.speed,
+                                      world_size=(game_message.constants.world.width,
+                                                  game_message.constants.world.height),
+                                      bounds=self.game_bounds)
+
         self.update_pending_collisions(game_message)
         self.update_actual_collisions(game_message)
         self.update_shot_rockets(game_message)
@@ -68,15 +109,17 @@ class Bot:
             return []
 
         # Targetting a meteor
-        meteors_collisions: list[Meteor] = self.compute_meteors_collisions(game_message)
-        target_meteor: Meteor = self.select_target_meteor(meteors_collisions, game_message)
+        if plan is not None and plan.tick != game_message.tick:
+            plan = None
+        meteors_collisions: list[Meteor] = self.compute_meteors_collisions(game_message, plan)
+        target_meteor: Meteor = self.select_target_meteor(meteors_collisions, game_message, plan)
         if target_meteor is None:
             return []
         elif target_meteor.meteorType in [MeteorType.Large, MeteorType.Medium] and self.reason == "Score":
             collision_time: float = self.estimate_collision_time(target_meteor, game_message.tick, game_message)
             self.target_child_meteors(target_meteor, collision_time, game_message)
 
-        # print(f"Shooting at {target_meteor.id} for {self.reason}. (Queued: {len(self.target_queue)}, Pending: {[collision.meteor.id for collision in self.pending_collisions]})")
+        # print(f"Shooting at {target_meteor.id} for {self.reason}. (Queued: {len(self.target_queue)}, Pending: {[collision.meteor_id for collision in self.pending_collisions]})")
 
         # Moving the cannon to hit the targetted meteor
         self.shot_rockets.append(Shot(id=-1, target=target_meteor, time=game_message.tick, reason=self.reason))
@@ -85,23 +128,43 @@ class Bot:
             ShootAction()
         ]
 
-    def compute_meteors_collisions(self, game_message: GameMessage) -> list[Meteor]:
+    def compute_meteors_collisions(self, game_message: GameMessage,
+                                   plan: Optional[InterceptPlan] = None) -> list[Meteor]:
         p_rocket: Vector = game_message.cannon.position
         v_rocket: float = game_message.constants.rockets.speed
         meteors_collisions: list[Meteor] = []
+        self.intercept_cache.sync(game_message.tick, p_rocket, v_rocket,
+                                  [meteor.id for meteor in game_message.meteors])
+        # Meteors already solved by the planner workers only need their collision point looked up
+        unplanned_meteors: list[Meteor] = [meteor for meteor in game_message.meteors
+                                           if plan is None or meteor.id not in plan]
+        # Skip the exact intercept for meteors that leave the playfield before any rocket can reach them
+        reachable = self.reach_map.reachable(
+            np.array([(meteor.position.x, meteor.position.y) for meteor in unplanned_meteors]),
+            np.array([(meteor.velocity.x, meteor.velocity.y) for meteor in unplanned_meteors]))
+        reachable_ids = {meteor.id for meteor, is_reachable in zip(unplanned_meteors, reachable) if is_reachable}
         for meteor in game_message.meteors:
-            collision_point = self.get_collision_position(meteor.position, meteor.velocity, p_rocket, v_rocket)
+            if plan is not None and meteor.id in plan:
+                collision_point = plan.collision_point(meteor.id)
+            elif meteor.id in reachable_ids:
+                collision_point, delta_t, iterations = self.solve_collision(
+                    meteor.position, meteor.velocity, p_rocket, v_rocket,
+                    initial_delta_t=self.intercept_cache.initial_guess(meteor.id))
+                self.intercept_cache.record(meteor.id, delta_t if collision_point is not None else None, iterations)
+            else:
+                continue
             if collision_point is not None:
-                meteor_copy: Meteor = copy.deepcopy(meteor)
-                meteor_copy.position = collision_point
+                # Vector is frozen, so a shallow copy with the new position is enough
+                meteor_copy: Meteor = dataclasses.replace(meteor, position=collision_point)
                 meteors_collisions.append(meteor_copy)
             else:
                 print(
                     f'Skipping collision computation for {meteor.meteorType} at position ({round(meteor.position.x)},{round(meteor.position.y)})')
         return meteors_collisions
 
-    def select_target_meteor(self, meteors: list[Meteor], game_message: GameMessage) -> Meteor:
-        pending_meteors = [collision.meteor.id for collision in self.pending_collisions]
+    def select_target_meteor(self, meteors: list[Meteor], game_message: GameMessage,
+                             plan: Optional[InterceptPlan] = None) -> Meteor:
+        pending_meteors = [collision.meteor_id for collision in self.pending_collisions]
         candidate_meteors: list[Meteor] = [meteor for meteor in meteors
                                            if meteor.id not in pending_meteors
                                            and self.is_inside_bounds(meteor.position)]
@@ -117,16 +180,21 @@ class Bot:
         else:
             self.reason = "Score"
             self.target_queue = []
-            scores = self.score_meteors(candidate_meteors, game_message)
+            scores = self.score_meteors(candidate_meteors, game_message, plan)
             sorted_candidates: list[Meteor] = [meteor for _, meteor in
                                                sorted(zip(scores, candidate_meteors), key=lambda x: (x[0] is None, x[0]), reverse=True)
 ]
             return sorted_candidates[0] if sorted_candidates else None
 
-    def score_meteors(self, meteors: List[Meteor], game_message: GameMessage) -> List[float]:
+    def score_meteors(self, meteors: List[Meteor], game_message: GameMessage,
+                      plan: Optional[InterceptPlan] = None) -> List[float]:
         scores: List[float] = []
 
         for meteor in meteors:
+            if plan is not None and meteor.id in plan:
+                scores.append(plan.score(meteor.id))
+                continue
+
             # Extract meteor properties
             x = meteor.position.x
             y = meteor.position.y
@@ -161,7 +229,7 @@ class Bot:
             child_meteor: Meteor = Meteor(id=-1, meteorType=child.meteorType, position=Vector(0, 0),
                                           velocity=Vector(0, 0), size=meteor_size)
             split_angle: float = radians(child.approximateAngle)
-            parent_speed: float = np.linalg.norm([parent_meteor.velocity.x, parent_meteor.velocity.y])
+            parent_speed: float = hypot(parent_meteor.velocity.x, parent_meteor.velocity.y)
             speed_ratio: float = game_message.constants.meteorInfos[child.meteorType].approximateSpeed / parent_speed
             child_meteor.velocity = Vector(
                 x=speed_ratio * (
@@ -176,7 +244,7 @@ class Bot:
                                                                 parent_collision_time, launch_time)
             if child_meteor.position is not None \
                     and self.is_inside_bounds(child_meteor.position) \
-                    and self.uncertainty_check(child_meteor, parent_meteor.position, game_message):
+                    and self.uncertainty_check(child_meteor, parent_meteor, game_message):
                 self.target_queue.append(child_meteor)
                 print(
                     f'Added {child_meteor.meteorType} meteor colliding at position ({round(child_meteor.position.x)},{round(child_meteor.position.y)}) to target_queue')
@@ -185,10 +253,17 @@ class Bot:
 
     def get_collision_position(self, p0_meteor: Vector, v_meteor: Vector, p0_rocket: Vector, v_rocket: float,
                                t0_meteor: float = 0.0, t0_rocket: float = 0.0) -> [Vector | None]:
+        position, _, _ = self.solve_collision(p0_meteor, v_meteor, p0_rocket, v_rocket, t0_meteor, t0_rocket)
+        return position
+
+    def solve_collision(self, p0_meteor: Vector, v_meteor: Vector, p0_rocket: Vector, v_rocket: float,
+                        t0_meteor: float = 0.0, t0_rocket: float = 0.0,
+                        initial_delta_t: float = 0.0) -> tuple[Vector | None, float, int]:
+        # Returns the collision position (None if not found), the solved delta_t and the iterations it took
 
         rocket_lead: float = t0_meteor - t0_rocket
-        if rocket_lead < 0: return None
-        delta_t: float = 0.0
+        if rocket_lead < 0: return None, 0.0, 0
+        delta_t: float = initial_delta_t
         rate: float = 0.02
         error: float = 1000.0
         iteration: int = 0
@@ -201,30 +276,27 @@ class Bot:
             iteration += 1
 
         if iteration == 100:
-            return None
+            return None, delta_t, iteration
         else:
-            return position
+            return position, delta_t, iteration
 
     def is_inside_bounds(self, position) -> bool:
         return (self.game_bounds[0] < position.x < self.game_bounds[1] and \
                 self.game_bounds[2] < position.y < self.game_bounds[3])
 
-    def uncertainty_check(self, meteor: Meteor, initial_position: Vector, game_message: GameMessage) -> bool:
-
-        speed_uncertainty = self.large_meteor_uncertainty if meteor.meteorType == MeteorType.Large \
-            else self.medium_meteor_uncertainty if meteor.meteorType == MeteorType.Medium \
-            else self.small_meteor_uncertainty
-        distance_to_travel = self.distance(meteor.position, initial_position)
-        position_uncertainty = distance_to_travel * speed_uncertainty
+    def uncertainty_check(self, meteor: Meteor, parent_meteor: Meteor, game_message: GameMessage) -> bool:
+        child_speed = game_message.constants.meteorInfos[meteor.meteorType].approximateSpeed
+        travel_time = self.distance(meteor.position, parent_meteor.position) / child_speed
 
-        rocket_vector = [meteor.position.x - game_message.cannon.position.x,
-                         meteor.position.y - game_message.cannon.position.y]
-        rocket_vector /= np.linalg.norm(rocket_vector)
-        meteor_vector = [meteor.velocity.x, meteor.velocity.y]
-        meteor_vector /= np.linalg.norm(meteor_vector)
+        rocket_direction = atan2(meteor.position.y - game_message.cannon.position.y,
+                                 meteor.position.x - game_message.cannon.position.x)
+        meteor_direction = atan2(meteor.velocity.y, meteor.velocity.x)
 
-        uncertainty = (1 - abs(np.dot(rocket_vector, meteor_vector))) * position_uncertainty
-        return uncertainty < meteor.size + game_message.constants.rockets.size
+        hit_probability = self.uncertainty_engine.hit_probability(
+            parent_meteor.meteorType, meteor.meteorType, child_speed, travel_time,
+            degrees(rocket_direction - meteor_direction), game_message.constants.rockets.speed,
+            meteor.size + game_message.constants.rockets.size)
+        return hit_probability >= self.min_hit_probability
 
     def distance(self, p1, p2) -> float:
         return sqrt((p1.x - p2.x) ** 2 + (p1.y - p2.y) ** 2)
@@ -234,7 +306,7 @@ class Bot:
             for meteor in game_message.meteors:
                 will_collide, mintime = self.will_collide(rocket, meteor)
                 if will_collide and not any(
-                        (collision.rocket.id == rocket.id and collision.meteor.id == meteor.id) for collision in
+                        (collision.rocket_id == rocket.id and collision.meteor_id == meteor.id) for collision in
                         self.pending_collisions):
                     self.pending_collisions.append(Collision(rocket, meteor, game_message.tick + mintime))
         self.remove_duplicate_collisions()
@@ -243,8 +315,8 @@ class Bot:
     def update_actual_collisions(self, game_message: GameMessage) -> None:
         for collision in self.pending_collisions:
             if collision.time - game_message.tick < 5 \
-                    and collision.rocket.id not in [collision.rocket.id for collision in self.actual_collisions] \
-                    and collision.meteor.id not in [collision.meteor.id for collision in self.actual_collisions]:
+                    and collision.rocket_id not in [collision.rocket_id for collision in self.actual_collisions] \
+                    and collision.meteor_id not in [collision.meteor_id for collision in self.actual_collisions]:
                 self.actual_collisions.append(collision)
 
     def will_collide(self, rocket: Projectile, meteor: Meteor) -> bool:
@@ -267,38 +339,39 @@ class Bot:
         # Remove collisions with same rocket or meteor but later time
         self.pending_collisions = [collision for i, collision in enumerate(self.pending_collisions)
                                    if not any(
-                (collision.rocket.id == other.rocket.id or collision.meteor.id == other.meteor.id)
+                (collision.rocket_id == other.rocket_id or collision.meteor_id == other.meteor_id)
                 and collision.time > other.time for other in self.pending_collisions)]
 
     def remove_old_collisions(self, game_message: GameMessage) -> None:
         # Check if rocket id and meteor id are still in the game
         self.pending_collisions = [collision for collision in self.pending_collisions
-                                   if collision.rocket.id in [rocket.id for rocket in game_message.rockets]
-                                   and collision.meteor.id in [meteor.id for meteor in game_message.meteors]]
+                                   if collision.rocket_id in [rocket.id for rocket in game_message.rockets]
+                                   and collision.meteor_id in [meteor.id for meteor in game_message.meteors]]
 
     def update_shot_rockets(self, game_message: GameMessage) -> None:
         for shot in self.shot_rockets:
             if shot.rocket_id == -1 and game_message.rockets:
                 shot.rocket_id = game_message.rockets[-1].id
-            elif shot.target.id == -1 and shot.rocket_id in [collision.rocket.id for collision in
+            elif shot.target_id == -1 and shot.rocket_id in [collision.rocket_id for collision in
                                                              self.actual_collisions]:
-                shot.target.id = \
-                [collision.meteor.id for collision in self.actual_collisions if collision.rocket.id == shot.rocket_id][
+                shot.target_id = \
+                [collision.meteor_id for collision in self.actual_collisions if collision.rocket_id == shot.rocket_id][
                     0]
 
     def print_missed_shots(self) -> None:
+        # Only the retained window of shots can be matched against their collisions
         missed_shots: list[Shot] = [shot for shot in self.shot_rockets
-                                    if (shot.rocket_id, shot.target.id)
-                                    not in [(collision.rocket.id, collision.meteor.id)
+                                    if (shot.rocket_id, shot.target_id)
+                                    not in [(collision.rocket_id, collision.meteor_id)
                                             for collision in self.actual_collisions]]
-        print(f"Missed shots: {len(missed_shots)}")
+        print(f"Missed shots: {len(missed_shots)} (last {len(self.shot_rockets)} shots)")
         for shot in missed_shots:
-            if shot.rocket_id in [collision.rocket.id for collision in self.actual_collisions]:
+            if shot.rocket_id in [collision.rocket_id for collision in self.actual_collisions]:
                 actual_hit = \
-                [collision.meteor.id for collision in self.actual_collisions if collision.rocket.id == shot.rocket_id][
+                [collision.meteor_id for collision in self.actual_collisions if collision.rocket_id == shot.rocket_id][
                     0]
                 print(
-                    f"[{shot.time}] Rocket {shot.rocket_id} aimed at meteor {shot.target.id} of type {shot.target.meteorType}, but hit {actual_hit} instead. ({shot.reason})")
+                    f"[{shot.time}] Rocket {shot.rocket_id} aimed at meteor {shot.target_id} of type {shot.target_type}, but hit {actual_hit} instead. ({shot.reason})")
             else:
                 print(
-                    f"[{shot.time}] Rocket {shot.rocket_id} aimed at meteor {shot.target.id} of type {shot.target.meteorType}, but simply missed. ({shot.reason})")
+                    f"[{shot.time}] Rocket {shot.rocket_id} aimed at meteor {shot.target_id} of type {shot.target_type}, but simply missed. ({shot.reason})")
@@ -0,0 +1,30 @@
+from collections import deque
+from typing import Deque, Generic, Iterator, TypeVar
+
+T = TypeVar("T")
+
+
+class BoundedHistory(Generic[T]):
+    """Ring buffer keeping only the most recent entries, with a running total that survives eviction."""
+
+    def __init__(self, max_size: int):
+        self.entries: Deque[T] = deque(maxlen=max_size)
+        self.total: int = 0
+
+    @property
+    def evicted(self) -> int:
+        return self.total - len(self.entries)
+
+    def append(self, entry: T) -> None:
+        self.entries.append(entry)
+        self.total += 1
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.total = 0
+
+    def __iter__(self) -> Iterator[T]:
+        return iter(self.entries)
+
+    def __len__(self) -> int:
+        return len(self.entries)
@@ -0,0 +1,73 @@
+from typing import Dict, Iterable, Optional
+
+from game_message import Vector
+
+
+class InterceptEntry:
+    def __init__(self, tick: int, delta_t: float, cold_iterations: int):
+        self.tick: int = tick
+        self.delta_t: float = delta_t
+        self.drift: float = 0.0
+        self.cold_iterations: int = cold_iterations
+
+
+class InterceptCache:
+    """Remembers the last solved intercept time of each meteor to warm-start the solver on the next tick."""
+
+    def __init__(self):
+        self.cannon_position: Optional[Vector] = None
+        self.rocket_speed: Optional[float] = None
+        self.tick: int = 0
+        self.entries: Dict[str, InterceptEntry] = {}
+        self.hits: int = 0
+        self.misses: int = 0
+        self.iterations: int = 0
+        self.iterations_saved: int = 0
+
+    def sync(self, tick: int, cannon_position: Vector, rocket_speed: float, meteor_ids: Iterable[str]) -> None:
+        self.tick = tick
+
+        # A moved cannon or a different rocket speed invalidates every solution
+        if cannon_position != self.cannon_position or rocket_speed != self.rocket_speed:
+            self.entries = {}
+            self.cannon_position = cannon_position
+            self.rocket_speed = rocket_speed
+            return
+
+        # Forget meteors that were destroyed or left the playfield
+        alive_ids = set(meteor_ids)
+        self.entries = {meteor_id: entry for meteor_id, entry in self.entries.items() if meteor_id in alive_ids}
+
+    def initial_guess(self, meteor_id: str) -> float:
+        entry = self.entries.get(meteor_id)
+        if entry is None:
+            return 0.0
+        # Intercept time drifts linearly for a meteor in straight motion, so extrapolate from the last two solves
+        return max(0.0, entry.delta_t + entry.drift * (self.tick - entry.tick))
+
+    def record(self, meteor_id: str, delta_t: Optional[float], iterations: int) -> None:
+        self.iterations += iterations
+        entry = self.entries.get(meteor_id)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.iterations_saved += max(0, entry.cold_iterations - iterations)
+
+        if delta_t is None:
+            self.entries.pop(meteor_id, None)
+        elif entry is None:
+            self.entries[meteor_id] = InterceptEntry(self.tick, delta_t, iterations)
+        elif self.tick > entry.tick:
+            entry.drift = (delta_t - entry.delta_t) / (self.tick - entry.tick)
+            entry.tick = self.tick
+            entry.delta_t = delta_t
+
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def report(self) -> str:
+        return (f"Intercept cache: {self.hits} hits, {self.misses} misses "
+                f"({round(100 * self.hit_rate(), 1)}% hit rate), "
+                f"{self.iterations} iterations, {self.iterations_saved} iterations saved")
@@ -8,18 +8,19 @@ class VectorField:
 
     SIGMOID_STEEPNESS = 10.0
 
-    def __init__(self, cannon_position: Tuple[float, float], edge_point: Tuple[int, int]):
+    def __init__(self, cannon_position: Tuple[float, float], edge_point: Tuple[int, int], cache_size: int = 4096):
         self.a_x, self.a_y = cannon_position
         self.b_x, self.b_y = map(float, edge_point)
         self.mid_point_x = (self.a_x + self.b_x) / 2
         self.sigmoid_scale = self.SIGMOID_STEEPNESS / (self.b_x - self.a_x)
+        # Bounded per-instance cache, released along with the field at the end of a game
+        self.compute_field = lru_cache(maxsize=cache_size)(self._compute_field)
 
     def _sigmoid(self, x: float) -> float:
         """Sigmoid function centered between a and b."""
         return 1 / (1 + np.exp(self.sigmoid_scale * (x - self.mid_point_x)))
 
-    @lru_cache(maxsize=None)
-    def compute_field(self, x: float, y: float, epsilon=1e-10) -> Tuple[float, float]:
+    def _compute_field(self, x: float, y: float, epsilon=1e-10) -> Tuple[float, float]:
         relative_x = x - self.a_x
         relative_y = y - self.a_y
         magnitude = np.sqrt(relative_x ** 2 + relative_y ** 2 + epsilon)
@@ -0,0 +1,210 @@
+import asyncio
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+import numpy as np
+
+from game_message import GameMessage, MeteorType, Vector
+from overengineered_weight_calculator import VectorField, WeightCalculator
+
+METEOR_TYPES: List[MeteorType] = list(MeteorType)
+
+
+def snapshot(game_message: GameMessage, ticks_ahead: int = 0) -> dict:
+    """Compact array snapshot of the meteors, extrapolated ticks_ahead ticks along their straight courses."""
+    meteors = game_message.meteors
+    positions = np.array([(meteor.position.x, meteor.position.y) for meteor in meteors], dtype=float).reshape(-1, 2)
+    velocities = np.array([(meteor.velocity.x, meteor.velocity.y) for meteor in meteors], dtype=float).reshape(-1, 2)
+    return {
+        "tick": game_message.tick + ticks_ahead,
+        "cannon": (game_message.cannon.position.x, game_message.cannon.position.y),
+        "rocket_speed": game_message.constants.rockets.speed,
+        "world": (game_message.constants.world.width, game_message.constants.world.height),
+        "ids": [meteor.id for meteor in meteors],
+        "types": np.array([METEOR_TYPES.index(meteor.meteorType) for meteor in meteors], dtype=np.int8),
+        "positions": positions + ticks_ahead * velocities,
+        "velocities": velocities,
+    }
+
+
+def solve_intercepts(positions: np.ndarray, velocities: np.ndarray, cannon: Tuple[float, float], rocket_speed: float,
+                     rate: float = 0.02, tolerance: float = 0.1, max_iterations: int = 100) -> np.ndarray:
+    """Vectorized Bot.solve_collision for rockets fired now. Rows are NaN where the solver does not converge."""
+    delta_t = np.zeros(len(positions))
+    points = positions.copy()
+    iterations = np.zeros(len(positions), dtype=int)
+    active = np.ones(len(positions), dtype=bool)
+    while active.any() and iterations.max() < max_iterations:
+        indices = np.flatnonzero(active)
+        points[indices] = positions[indices] + delta_t[indices, None] * velocities[indices]
+        error = np.hypot(points[indices, 0] - cannon[0], points[indices, 1] - cannon[1]) \
+            - delta_t[indices] * rocket_speed
+        delta_t[indices] += rate * error
+        iterations[indices] += 1
+        active[indices[np.abs(error) <= tolerance]] = False
+
+    points[iterations >= max_iterations] = np.nan
+    return points
+
+
+_weight_calculators: Dict[Tuple, WeightCalculator] = {}
+
+
+def plan_tick(tick_snapshot: dict) -> dict:
+    """Runs in a worker process: intercept points and scores of every meteor of a snapshot."""
+    points = solve_intercepts(tick_snapshot["positions"], tick_snapshot["velocities"], tick_snapshot["cannon"],
+                              tick_snapshot["rocket_speed"])
+
+    key = (tick_snapshot["cannon"], tick_snapshot["world"])
+    if key not in _weight_calculators:
+        _weight_calculators[key] = WeightCalculator(VectorField(cannon_position=tick_snapshot["cannon"],
+                                                                edge_point=tick_snapshot["world"]))
+    weight_calculator = _weight_calculators[key]
+
+    scores = np.full(len(points), np.nan)
+    for index, ((x, y), (velocity_x, velocity_y), meteor_type) in enumerate(
+            zip(points.tolist(), tick_snapshot["velocities"].tolist(), tick_snapshot["types"].tolist())):
+        if not np.isnan(x):
+            scores[index] = weight_calculator.compute_weight(METEOR_TYPES[meteor_type].value, x, y,
+                                                             velocity_x, velocity_y)
+    return {"tick": tick_snapshot["tick"], "ids": tick_snapshot["ids"], "collision_points": points, "scores": scores}
+
+
+def _warm_up() -> None:
+    pass
+
+
+class InterceptPlan:
+    """Intercept points and scores computed by a worker, looked up by meteor id."""
+
+    def __init__(self, result: dict):
+        self.tick: int = result["tick"]
+        self.collision_points: np.ndarray = result["collision_points"]
+        self.scores: np.ndarray = result["scores"]
+        self.index: Dict[str, int] = {meteor_id: index for index, meteor_id in enumerate(result["ids"])}
+
+    def __contains__(self, meteor_id: str) -> bool:
+        return meteor_id in self.index
+
+    def collision_point(self, meteor_id: str) -> Optional[Vector]:
+        x, y = self.collision_points[self.index[meteor_id]]
+        return None if np.isnan(x) else Vector(x=float(x), y=float(y))
+
+    def score(self, meteor_id: str) -> float:
+        return float(self.scores[self.index[meteor_id]])
+
+
+class PlannerPool:
+    """Persistent worker processes doing the intercept and scoring work off the event loop.
+
+    During cooldown ticks the state at the next cooldown-zero tick is extrapolated and planned speculatively, so
+    that the plan is usually ready when that tick arrives. Meteors missing from a plan (new or exploded since the
+    speculation) are left to the bot to compute in-process. Child meteor prediction and the collision bookkeeping
+    stay in the bot as well: they depend on its target choice and history, and cost less than a round trip.
+
+    A plan that is not ready within budget seconds is given up on, and the bot gets the last finished plan for the
+    tick instead, if any. A running job cannot be stopped, so it keeps its worker and no other job is queued behind
+    it until it is done. When a worker dies the pool is broken for good and shuts itself down.
+    """
+
+    def __init__(self, workers: int, budget: float = 0.04):
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+        self.workers = workers
+        self.budget = budget
+        self.broken = False
+        # Job in flight, with the tick and meteors it plans for
+        self.job: Optional[Future] = None
+        self.job_tick: Optional[int] = None
+        self.job_ids: FrozenSet[str] = frozenset()
+        # Result of the last job that finished
+        self.finished: Optional[dict] = None
+        # Start the workers and pay their imports before the first tick arrives
+        for _ in range(workers):
+            self.executor.submit(_warm_up)
+
+    def _submit(self, tick_snapshot: dict, meteor_ids: FrozenSet[str]) -> None:
+        try:
+            self.job = self.executor.submit(plan_tick, tick_snapshot)
+        except BrokenProcessPool as error:
+            self._break(error)
+            return
+        self.job_tick = tick_snapshot["tick"]
+        self.job_ids = meteor_ids
+
+    def _collect(self) -> None:
+        # Keeps the result of the job once it is done, and finds out about dead workers
+        job = self.job
+        if job is None or not job.done():
+            return
+        self.job = None
+        if job.cancelled():
+            return
+        error = job.exception()
+        if isinstance(error, BrokenProcessPool):
+            self._break(error)
+        elif error is not None:
+            print(f"Planner job for tick {self.job_tick} failed: {error!r}")
+        else:
+            self.finished = job.result()
+
+    def _finished_plan(self, tick: int) -> Optional[InterceptPlan]:
+        if self.finished is None or self.finished["tick"] != tick:
+            return None
+        return InterceptPlan(self.finished)
+
+    def _break(self, error: BaseException) -> None:
+        print(f"Planner pool is broken, planning in-process from now on: {error!r}")
+        self.broken = True
+        self.job = None
+        self.close()
+
+    def speculate(self, game_message: GameMessage) -> None:
+        self._collect()
+        # A single job is in flight at a time. A speculation is only redone when new meteors appeared during the
+        # first half of the cooldown, so that it is done by cooldown zero; later meteors are solved in-process.
+        if self.broken or self.job is not None:
+            return
+        target_tick = game_message.tick + game_message.cannon.cooldown
+        if self.job_tick == target_tick:
+            if game_message.cannon.cooldown <= game_message.constants.cannonCooldownTicks // 2:
+                return
+            if all(meteor.id in self.job_ids for meteor in game_message.meteors):
+                return
+        self._submit(snapshot(game_message, ticks_ahead=game_message.cannon.cooldown),
+                     frozenset(meteor.id for meteor in game_message.meteors))
+
+    async def plan(self, game_message: GameMessage) -> Optional[InterceptPlan]:
+        """
+        Plan of this tick, possibly missing meteors that appeared since it was speculated, or None when no plan is
+        ready within the budget and the bot has to compute the tick in-process.
+        """
+        self._collect()
+        if self.broken:
+            return None
+        tick = game_message.tick
+        if self.job is not None and self.job_tick != tick:
+            # A stale job can only be dropped before it starts, and with a single worker the plan would wait for it
+            if not self.job.cancel() and self.workers == 1:
+                print(f"Tick {tick}: planner busy with a stale job, planning in-process")
+                return self._finished_plan(tick)
+            self.job = None
+        if self.job is None:
+            if self.finished is not None and self.finished["tick"] == tick:
+                return self._finished_plan(tick)
+            self._submit(snapshot(game_message), frozenset(meteor.id for meteor in game_message.meteors))
+            if self.broken:
+                return None
+
+        job = asyncio.wrap_future(self.job)
+        done, _ = await asyncio.wait({job}, timeout=self.budget)
+        if not done:
+            # Only drops the job if it is still queued. A running one is collected once it is done.
+            job.cancel()
+            print(f"Tick {tick}: no plan within {1000 * self.budget:g} ms, using the last finished one")
+            return self._finished_plan(tick)
+        self._collect()
+        return None if self.broken else self._finished_plan(tick)
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
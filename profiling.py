@@ -0,0 +1,181 @@
+import contextlib
+import cProfile
+import io
+import os
+import pstats
+import tracemalloc
+from typing import Any, Iterator, List, Optional, Tuple
+
+
+class TickProfiler:
+    """Samples CPU profiles and allocation traces for selected ticks and dumps one report per tick window.
+
+    Configured from the environment (see from_env) or at runtime with a PROFILE control message:
+        {"type": "PROFILE", "mode": "cpu,memory", "firstTick": 200, "lastTick": 400, "every": 5, "window": 100}
+    An empty mode turns profiling off.
+
+    Dumps are only queued when a window ends, since that happens during a tick. write_dumps writes them to disk and
+    is meant to be called once the tick's command is sent.
+    """
+
+    def __init__(self, mode: str = "", first_tick: int = 0, last_tick: Optional[int] = None, every: int = 1,
+                 window: int = 100, output_dir: str = "profiles", top: int = 30):
+        self.output_dir = output_dir
+        self.top = top
+        self.cpu_profile: Optional[cProfile.Profile] = None
+        self.allocation_reports: list[str] = []
+        self.current_window: Optional[int] = None
+        self.first_sampled_tick: Optional[int] = None
+        self.last_sampled_tick: Optional[int] = None
+        self.pending_dumps: List[Tuple[str, Optional[cProfile.Profile], List[str]]] = []
+        self.configure(mode, first_tick, last_tick, every, window)
+
+    @classmethod
+    def from_env(cls) -> "TickProfiler":
+        """
+        PROFILE_MODE: "cpu", "memory" or "cpu,memory"
+        PROFILE_TICKS: tick range to sample, e.g. "200-400" or "200-" (all ticks by default)
+        PROFILE_EVERY: only sample every Nth tick of the range
+        PROFILE_WINDOW: number of ticks aggregated in each dump
+        PROFILE_DIR: directory where dumps are written
+        """
+        first_tick, last_tick = 0, None
+        if os.environ.get("PROFILE_TICKS"):
+            first, separator, last = os.environ["PROFILE_TICKS"].partition("-")
+            first_tick = int(first)
+            if last:
+                last_tick = int(last)
+            elif not separator:
+                # A single tick, while "200-" samples from tick 200 to the end of the game
+                last_tick = first_tick
+        return cls(mode=os.environ.get("PROFILE_MODE", ""),
+                   first_tick=first_tick,
+                   last_tick=last_tick,
+                   every=int(os.environ.get("PROFILE_EVERY", 1)),
+                   window=int(os.environ.get("PROFILE_WINDOW", 100)),
+                   output_dir=os.environ.get("PROFILE_DIR", "profiles"))
+
+    def configure(self, mode: Optional[str] = "", first_tick: Optional[int] = 0, last_tick: Optional[int] = None,
+                  every: Optional[int] = 1, window: Optional[int] = 100) -> None:
+        """Null fields take their default value. Raises ValueError, leaving the settings unchanged, on invalid ones."""
+        if mode is None:
+            mode = ""
+        if not isinstance(mode, str):
+            raise ValueError(f"Invalid profiling mode {mode!r}")
+        modes = {part.strip() for part in mode.split(",") if part.strip()}
+        unknown_modes = modes - {"cpu", "memory"}
+        if unknown_modes:
+            raise ValueError(f"Invalid profiling mode {', '.join(sorted(unknown_modes))}")
+        first_tick = _as_int("first tick", first_tick, 0)
+        last_tick = _as_int("last tick", last_tick, None)
+        every = _as_int("sampling interval", every, 1)
+        window = _as_int("window", window, 100)
+
+        self.flush()
+        self.cpu = "cpu" in modes
+        self.memory = "memory" in modes
+        self.first_tick = first_tick
+        self.last_tick = last_tick
+        self.every = max(1, every)
+        self.window = max(1, window)
+        if self.enabled:
+            try:
+                os.makedirs(self.output_dir, exist_ok=True)
+            except OSError as error:
+                # Dumps are dropped in write_dumps if the directory cannot be written to, profiling goes on
+                print(f"Cannot create profiling directory {self.output_dir}: {error}")
+            print(f"Profiling {', '.join(sorted(modes))} from tick {first_tick} to {last_tick}, every {self.every} "
+                  f"tick(s), {self.window} ticks per dump in {self.output_dir}")
+
+    @property
+    def enabled(self) -> bool:
+        return self.cpu or self.memory
+
+    def should_sample(self, tick: int) -> bool:
+        return (self.enabled
+                and tick >= self.first_tick
+                and (self.last_tick is None or tick <= self.last_tick)
+                and (tick - self.first_tick) % self.every == 0)
+
+    @contextlib.contextmanager
+    def profile_tick(self, tick: int) -> Iterator[None]:
+        if self.current_window is not None and tick // self.window != self.current_window:
+            self.flush()
+        if not self.should_sample(tick):
+            yield
+            return
+
+        if self.current_window is None:
+            self._start_window(tick)
+        self.last_sampled_tick = tick
+
+        if self.memory:
+            tracemalloc.start()
+        if self.cpu:
+            self.cpu_profile.enable()
+        try:
+            yield
+        finally:
+            if self.cpu:
+                self.cpu_profile.disable()
+            if self.memory:
+                # Tracing stays off between sampled ticks so unsampled ticks run at full speed
+                _, peak = tracemalloc.get_traced_memory()
+                self.allocation_reports.append(self._allocation_report(tick, peak, tracemalloc.take_snapshot()))
+                tracemalloc.stop()
+
+    def _start_window(self, tick: int) -> None:
+        self.current_window = tick // self.window
+        self.first_sampled_tick = tick
+        self.cpu_profile = cProfile.Profile() if self.cpu else None
+        self.allocation_reports = []
+
+    def _allocation_report(self, tick: int, peak: int, snapshot: tracemalloc.Snapshot) -> str:
+        stats = snapshot.statistics("lineno")
+        lines = [f"Tick {tick}: peak {peak / 1024:.1f} KiB, {sum(stat.size for stat in stats) / 1024:.1f} KiB "
+                 f"still allocated at the end of the tick"]
+        lines += [str(stat) for stat in stats[:self.top]]
+        return "\n".join(lines)
+
+    def flush(self) -> None:
+        """Ends the current window and queues its dump for write_dumps."""
+        if self.current_window is None:
+            return
+
+        name = f"ticks_{self.first_sampled_tick}-{self.last_sampled_tick}"
+        self.pending_dumps.append((name, self.cpu_profile, self.allocation_reports))
+        self.current_window = None
+        self.cpu_profile = None
+        self.allocation_reports = []
+
+    def write_dumps(self) -> None:
+        pending_dumps, self.pending_dumps = self.pending_dumps, []
+        for name, cpu_profile, allocation_reports in pending_dumps:
+            try:
+                self._write_dump(name, cpu_profile, allocation_reports)
+            except OSError as error:
+                # A full disk or an unwritable directory must not stop the game
+                print(f"Dropped profile dump for {name}: {error}")
+            else:
+                print(f"Wrote profile dump for {name} to {self.output_dir}")
+
+    def _write_dump(self, name: str, cpu_profile: Optional[cProfile.Profile], allocation_reports: List[str]) -> None:
+        if cpu_profile is not None:
+            cpu_profile.dump_stats(os.path.join(self.output_dir, f"cpu_{name}.prof"))
+            report = io.StringIO()
+            pstats.Stats(cpu_profile, stream=report).sort_stats("cumulative").print_stats(self.top)
+            with open(os.path.join(self.output_dir, f"cpu_{name}.txt"), "w") as file:
+                file.write(report.getvalue())
+
+        if allocation_reports:
+            with open(os.path.join(self.output_dir, f"alloc_{name}.txt"), "w") as file:
+                file.write("\n\n".join(allocation_reports) + "\n")
+
+
+def _as_int(name: str, value: Any, default: Optional[int]) -> Optional[int]:
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f"Invalid profiling {name} {value!r}") from None
@@ -0,0 +1,282 @@
+#!/usr/bin/env python
+"""Seeded GameMessage sequences for stress tests, and a search for the largest scene the bot handles in time."""
+
+import argparse
+import contextlib
+import copy
+import io
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional
+
+import cattrs
+import numpy as np
+
+from game_message import GameMessage
+
+DEFAULT_CONSTANTS = {
+    "world": {"width": 1000, "height": 800},
+    "rockets": {"speed": 20.0, "size": 5.0},
+    "cannonCooldownTicks": 10,
+    "meteorInfos": {
+        "LARGE": {"score": 10, "size": 40.0, "approximateSpeed": 3.0, "explodesInto": [
+            {"meteorType": "MEDIUM", "approximateAngle": 45.0},
+            {"meteorType": "MEDIUM", "approximateAngle": -45.0}]},
+        "MEDIUM": {"score": 20, "size": 20.0, "approximateSpeed": 6.0, "explodesInto": [
+            {"meteorType": "SMALL", "approximateAngle": 30.0},
+            {"meteorType": "SMALL", "approximateAngle": -30.0}]},
+        "SMALL": {"score": 40, "size": 10.0, "approximateSpeed": 12.0, "explodesInto": []},
+    },
+}
+
+METEOR_TYPES: List[str] = ["LARGE", "MEDIUM", "SMALL"]
+
+
+@dataclass
+class SceneConfig:
+    seed: int = 0
+    ticks: int = 1000
+    # Expected number of meteors entering from the right edge each tick
+    spawn_rate: float = 0.1
+    # When set, the scene is refilled every tick to keep exactly this many meteors alive
+    population: Optional[int] = None
+    type_mix: Dict[str, float] = field(default_factory=lambda: {"LARGE": 1.0, "MEDIUM": 1.0, "SMALL": 1.0})
+    # Standard deviations, relative to MeteorInfos.approximateSpeed and in degrees around the entry heading
+    speed_jitter: float = 0.1
+    heading_jitter: float = 30.0
+    # Probability per tick that a meteor explodes into its MeteorInfos.explodesInto children
+    explosion_rate: float = 0.0
+    explosion_angle_jitter: float = 5.0
+    rocket_count: int = 0
+    constants: dict = field(default_factory=lambda: copy.deepcopy(DEFAULT_CONSTANTS))
+
+
+class SceneGenerator:
+    """Simulates straight-line meteor traffic with numpy arrays and emits it as tick messages."""
+
+    def __init__(self, config: SceneConfig):
+        self.config = config
+        self.rng = np.random.default_rng(config.seed)
+        constants = config.constants
+        self.width = float(constants["world"]["width"])
+        self.height = float(constants["world"]["height"])
+        self.cannon = np.array([20.0, self.height / 2])
+        self.infos = [constants["meteorInfos"][meteor_type] for meteor_type in METEOR_TYPES]
+        mix = np.array([config.type_mix.get(meteor_type, 0.0) for meteor_type in METEOR_TYPES])
+        self.type_probabilities = mix / mix.sum()
+
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.types = np.zeros(0, dtype=np.int8)
+        self.positions = np.zeros((0, 2))
+        self.velocities = np.zeros((0, 2))
+        self.next_id = 0
+        self.rocket_ids = np.zeros(0, dtype=np.int64)
+        self.rocket_positions = np.zeros((0, 2))
+        self.rocket_velocities = np.zeros((0, 2))
+
+    def _add_meteors(self, types: np.ndarray, positions: np.ndarray, headings: np.ndarray) -> None:
+        base_speeds = np.array([info["approximateSpeed"] for info in self.infos])[types]
+        speeds = base_speeds * np.maximum(0.1, 1.0 + self.config.speed_jitter * self.rng.standard_normal(len(types)))
+        velocities = np.stack([speeds * np.cos(headings), speeds * np.sin(headings)], axis=1)
+        self.ids = np.concatenate([self.ids, np.arange(self.next_id, self.next_id + len(types))])
+        self.next_id += len(types)
+        self.types = np.concatenate([self.types, types.astype(np.int8)])
+        self.positions = np.concatenate([self.positions, positions])
+        self.velocities = np.concatenate([self.velocities, velocities])
+
+    def _spawn(self, count: int, anywhere: bool = False) -> None:
+        if count <= 0:
+            return
+        types = self.rng.choice(len(METEOR_TYPES), size=count, p=self.type_probabilities)
+        xs = self.rng.uniform(self.cannon[0], self.width, count) if anywhere else np.full(count, self.width)
+        positions = np.stack([xs, self.rng.uniform(0, self.height, count)], axis=1)
+        headings = np.radians(180.0 + self.config.heading_jitter * self.rng.standard_normal(count))
+        self._add_meteors(types, positions, headings)
+
+    def _explode(self) -> None:
+        exploding = self.rng.random(len(self.ids)) < self.config.explosion_rate
+        exploding &= np.array([bool(self.infos[meteor_type]["explodesInto"]) for meteor_type in self.types], dtype=bool)
+        if not exploding.any():
+            return
+
+        child_types, child_positions, child_headings = [], [], []
+        for index in np.flatnonzero(exploding):
+            parent_heading = np.arctan2(self.velocities[index, 1], self.velocities[index, 0])
+            for child in self.infos[self.types[index]]["explodesInto"]:
+                child_types.append(METEOR_TYPES.index(child["meteorType"]))
+                child_positions.append(self.positions[index])
+                child_headings.append(parent_heading + np.radians(
+                    child["approximateAngle"] + self.config.explosion_angle_jitter * self.rng.standard_normal()))
+        self._keep(~exploding)
+        self._add_meteors(np.array(child_types), np.array(child_positions), np.array(child_headings))
+
+    def _keep(self, mask: np.ndarray) -> None:
+        self.ids, self.types = self.ids[mask], self.types[mask]
+        self.positions, self.velocities = self.positions[mask], self.velocities[mask]
+
+    def _update_rockets(self) -> None:
+        self.rocket_positions += self.rocket_velocities
+        alive = ((0 <= self.rocket_positions[:, 0]) & (self.rocket_positions[:, 0] <= self.width)
+                 & (0 <= self.rocket_positions[:, 1]) & (self.rocket_positions[:, 1] <= self.height))
+        self.rocket_ids = self.rocket_ids[alive]
+        self.rocket_positions, self.rocket_velocities = self.rocket_positions[alive], self.rocket_velocities[alive]
+
+        missing = self.config.rocket_count - len(self.rocket_ids)
+        if missing > 0:
+            angles = self.rng.uniform(-np.pi / 3, np.pi / 3, missing)
+            speed = self.config.constants["rockets"]["speed"]
+            self.rocket_ids = np.concatenate([self.rocket_ids, np.arange(self.next_id, self.next_id + missing)])
+            self.next_id += missing
+            self.rocket_positions = np.concatenate([self.rocket_positions, np.tile(self.cannon, (missing, 1))])
+            self.rocket_velocities = np.concatenate(
+                [self.rocket_velocities, np.stack([speed * np.cos(angles), speed * np.sin(angles)], axis=1)])
+
+    def step(self, tick: int) -> None:
+        if tick == 0 and self.config.population:
+            self._spawn(self.config.population, anywhere=True)
+        self._spawn(self.rng.poisson(self.config.spawn_rate))
+        if self.config.explosion_rate:
+            self._explode()
+
+        self.positions += self.velocities
+        self._keep((0 <= self.positions[:, 0]) & (self.positions[:, 0] <= self.width)
+                   & (0 <= self.positions[:, 1]) & (self.positions[:, 1] <= self.height))
+        if self.config.population:
+            self._spawn(self.config.population - len(self.ids))
+            self._keep(np.arange(len(self.ids)) >= len(self.ids) - self.config.population)
+        self._update_rockets()
+
+    def raw_messages(self) -> Iterator[dict]:
+        """JSON-compatible tick messages, as received from the game server."""
+        constants = self.config.constants
+        sizes = [info["size"] for info in self.infos]
+        rocket_size = constants["rockets"]["size"]
+        for tick in range(self.config.ticks):
+            self.step(tick)
+            yield {
+                "type": "TICK",
+                "tick": tick,
+                "lastTickErrors": [],
+                "constants": constants,
+                "cannon": {"position": {"x": float(self.cannon[0]), "y": float(self.cannon[1])},
+                           "orientation": 0.0,
+                           "cooldown": -tick % constants["cannonCooldownTicks"]},
+                "meteors": [{"id": str(meteor_id),
+                             "position": {"x": x, "y": y},
+                             "velocity": {"x": v_x, "y": v_y},
+                             "size": sizes[meteor_type],
+                             "meteorType": METEOR_TYPES[meteor_type]}
+                            for meteor_id, meteor_type, (x, y), (v_x, v_y)
+                            in zip(self.ids.tolist(), self.types.tolist(), self.positions.tolist(),
+                                   self.velocities.tolist())],
+                "rockets": [{"id": str(rocket_id),
+                             "position": {"x": x, "y": y},
+                             "velocity": {"x": v_x, "y": v_y},
+                             "size": rocket_size}
+                            for rocket_id, (x, y), (v_x, v_y)
+                            in zip(self.rocket_ids.tolist(), self.rocket_positions.tolist(),
+                                   self.rocket_velocities.tolist())],
+                "score": 0,
+            }
+
+    def messages(self) -> Iterator[GameMessage]:
+        for raw_message in self.raw_messages():
+            yield cattrs.structure(raw_message, GameMessage)
+
+    def json_messages(self) -> Iterator[str]:
+        for raw_message in self.raw_messages():
+            yield json.dumps(raw_message)
+
+    def array_snapshots(self) -> Iterator[Dict[str, np.ndarray]]:
+        """Columnar snapshots of every tick, without building any message."""
+        for tick in range(self.config.ticks):
+            self.step(tick)
+            yield {
+                "tick": np.array(tick),
+                "meteor_ids": self.ids.copy(),
+                "meteor_types": self.types.copy(),
+                "meteor_positions": self.positions.copy(),
+                "meteor_velocities": self.velocities.copy(),
+                "rocket_ids": self.rocket_ids.copy(),
+                "rocket_positions": self.rocket_positions.copy(),
+                "rocket_velocities": self.rocket_velocities.copy(),
+            }
+
+
+def measure_latency(bot_factory: Callable[[], object], config: SceneConfig, percentile: float = 99.0,
+                    repeats: int = 3) -> float:
+    """
+    get_next_move latency in milliseconds at the given percentile, over the ticks where the cannon can shoot.
+
+    Only cooldown-zero ticks do the targeting work, so other ticks would dilute the percentile, and the first tick
+    pays one-time setup. The game is replayed repeats times with a fresh bot and every tick keeps its median
+    latency, so that a single scheduling hiccup does not decide the percentile.
+    """
+    messages = list(SceneGenerator(config).messages())
+    latencies = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeats):
+            bot = bot_factory()
+            replay = []
+            for game_message in messages:
+                start = time.perf_counter()
+                bot.get_next_move(game_message)
+                if game_message.tick > 0 and game_message.cannon.cooldown == 0:
+                    replay.append(time.perf_counter() - start)
+            latencies.append(replay)
+    return 1000 * float(np.percentile(np.median(latencies, axis=0), percentile))
+
+
+def find_meteor_headroom(bot_factory: Callable[[], object], deadline_ms: float, base_config: SceneConfig,
+                         percentile: float = 99.0, max_meteors: int = 20000, repeats: int = 3) -> int:
+    """Largest constant meteor population for which the bot's latency percentile stays under the deadline."""
+
+    def meets_deadline(population: int) -> bool:
+        config = copy.deepcopy(base_config)
+        config.population = population
+        latency = measure_latency(bot_factory, config, percentile, repeats)
+        print(f"{population} meteors: p{percentile:g} latency {latency:.2f} ms")
+        return latency <= deadline_ms
+
+    # Double until the deadline is missed, then bisect between the last passing and the first failing counts
+    passing, failing = 0, 1
+    while failing <= max_meteors and meets_deadline(failing):
+        passing, failing = failing, failing * 2
+    if failing > max_meteors:
+        # Doubling overshot the cap, which still has to be tested itself
+        if passing == max_meteors or meets_deadline(max_meteors):
+            return max_meteors
+        failing = max_meteors
+    while failing - passing > 1:
+        middle = (passing + failing) // 2
+        if meets_deadline(middle):
+            passing = middle
+        else:
+            failing = middle
+    return passing
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--ticks", type=int, default=201, help="Ticks simulated for each measurement")
+    parser.add_argument("--deadline-ms", type=float, default=100.0)
+    parser.add_argument("--percentile", type=float, default=99.0)
+    parser.add_argument("--explosion-rate", type=float, default=0.0)
+    parser.add_argument("--rockets", type=int, default=0)
+    parser.add_argument("--max-meteors", type=int, default=20000)
+    parser.add_argument("--repeats", type=int, default=3, help="Replays of each measurement, median taken per tick")
+    args = parser.parse_args()
+
+    from bot import Bot
+
+    config = SceneConfig(seed=args.seed, ticks=args.ticks, spawn_rate=0.0, explosion_rate=args.explosion_rate,
+                         rocket_count=args.rockets)
+    headroom = find_meteor_headroom(Bot, args.deadline_ms, config, args.percentile, args.max_meteors,
+                                    args.repeats)
+    print(f"Bot meets the {args.deadline_ms:g} ms deadline up to {headroom} simultaneous meteors")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+"""Measures the bot's cold start: time from process start to REGISTER received, and to the first command."""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from typing import Tuple
+
+import websockets
+
+from scene_generator import SceneConfig, SceneGenerator
+
+
+async def measure_once(bot_dir: str) -> Tuple[float, float]:
+    first_tick = json.dumps(next(SceneGenerator(SceneConfig(population=50)).raw_messages()))
+    registered = asyncio.get_running_loop().create_future()
+    answered = asyncio.get_running_loop().create_future()
+
+    async def handler(websocket, path=None):
+        await websocket.recv()
+        registered.set_result(time.perf_counter())
+        await websocket.send(first_tick)
+        await websocket.recv()
+        answered.set_result(time.perf_counter())
+        await websocket.close()
+
+    # application.py always connects to this address
+    async with websockets.serve(handler, "127.0.0.1", 8765, max_size=None):
+        start = time.perf_counter()
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, "application.py", cwd=bot_dir,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            register_time = await asyncio.wait_for(registered, timeout=60)
+            answer_time = await asyncio.wait_for(answered, timeout=60)
+        finally:
+            if process.returncode is None:
+                process.kill()
+            await process.wait()
+    return register_time - start, answer_time - start
+
+
+def extract_bundle(bundle: str) -> str:
+    bot_dir = tempfile.mkdtemp(prefix="bot_bundle_")
+    with zipfile.ZipFile(bundle) as archive:
+        archive.extractall(bot_dir)
+    return bot_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--bundle", help="Zip built by zip_bot.bash to benchmark instead of the source tree")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--importtime", action="store_true", help="Print the slowest imports of one extra run")
+    args = parser.parse_args()
+
+    bot_dir = extract_bundle(args.bundle) if args.bundle else os.path.dirname(os.path.abspath(__file__))
+    try:
+        results = [asyncio.run(measure_once(bot_dir)) for _ in range(args.runs)]
+        for label, values in (("REGISTER sent", [register for register, _ in results]),
+                              ("first command sent", [answer for _, answer in results])):
+            print(f"{label}: median {1000 * statistics.median(values):.1f} ms, "
+                  f"min {1000 * min(values):.1f} ms, max {1000 * max(values):.1f} ms over {args.runs} runs")
+
+        if args.importtime:
+            process = subprocess.run([sys.executable, "-X", "importtime", "-c", "import application"], cwd=bot_dir,
+                                     capture_output=True, text=True)
+            imports = [line.split("|") for line in process.stderr.splitlines() if line.startswith("import time:")]
+            imports = [(int(cumulative), name.rstrip()) for _, cumulative, name in imports[1:]]
+            print("Slowest imports before REGISTER (cumulative us):")
+            for cumulative, name in sorted(imports, reverse=True)[:15]:
+                print(f"{cumulative:>10} {name}")
+    finally:
+        if args.bundle:
+            shutil.rmtree(bot_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+#!/usr/bin/env python
+"""Feeds the same GameMessage stream to several bot implementations in lockstep and compares them."""
+
+import argparse
+import contextlib
+import io
+import json
+import time
+import tracemalloc
+from math import atan2, cos, radians, sin, sqrt
+from typing import AbstractSet, Callable, Dict, Iterator, List, Optional, Set
+
+import cattrs
+import numpy as np
+
+from actions import LookAtAction, RotateAction, ShootAction
+from game_message import GameMessage, Meteor, Vector
+from scene_generator import SceneConfig, SceneGenerator
+
+BOT_REGISTRY: Dict[str, Callable[[], object]] = {}
+
+
+def register_bot(name: str):
+    def decorator(factory: Callable[[], object]) -> Callable[[], object]:
+        BOT_REGISTRY[name] = factory
+        return factory
+
+    return decorator
+
+
+@register_bot("old")
+def _old_bot():
+    from old_bot import Bot
+    return Bot()
+
+
+@register_bot("new")
+def _new_bot():
+    from bot import Bot
+    return Bot()
+
+
+def recorded_stream(path: str) -> Iterator[dict]:
+    """Raw tick messages from a file recorded by application.py (one JSON message per line)."""
+    with open(path) as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+class BotRun:
+    def __init__(self, name: str, trace_allocations: bool):
+        self.name: str = name
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.bot = BOT_REGISTRY[name]()
+        self.trace_allocations: bool = trace_allocations
+        self.latencies: List[float] = []
+        self.allocated: List[int] = []
+        self.allocated_blocks: List[int] = []
+        self.shots: int = 0
+        # Meteors already credited to one of this bot's shots. The stream does not react to the shots, so a meteor
+        # that was hit stays in the following ticks and must not be credited again.
+        self.claimed_meteor_ids: Set[str] = set()
+        self.predicted_score: float = 0.0
+
+    def play(self, game_message: GameMessage) -> None:
+        if self.trace_allocations:
+            before = take_snapshot()
+            tracemalloc.reset_peak()
+            baseline, _ = tracemalloc.get_traced_memory()
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            actions = self.bot.get_next_move(game_message)
+            latency = time.perf_counter() - start
+
+        if self.trace_allocations:
+            _, peak = tracemalloc.get_traced_memory()
+            self.allocated.append(peak - baseline)
+            # tracemalloc only sees live blocks, so this counts the blocks the decision left allocated
+            self.allocated_blocks.append(sum(max(0, stat.count_diff)
+                                             for stat in take_snapshot().compare_to(before, "filename")))
+        self.latencies.append(latency)
+
+        self.score_actions(actions, game_message)
+
+    @property
+    def predicted_hits(self) -> int:
+        return len(self.claimed_meteor_ids)
+
+    def score_actions(self, actions: list, game_message: GameMessage) -> None:
+        orientation = game_message.cannon.orientation
+        for action in actions:
+            if isinstance(action, RotateAction):
+                orientation += action.angle
+            elif isinstance(action, LookAtAction):
+                orientation = np.degrees(atan2(action.target.y - game_message.cannon.position.y,
+                                               action.target.x - game_message.cannon.position.x))
+            elif isinstance(action, ShootAction):
+                self.shots += 1
+                target = predict_hit(orientation, game_message, self.claimed_meteor_ids)
+                if target is not None:
+                    self.claimed_meteor_ids.add(target.id)
+                    self.predicted_score += game_message.constants.meteorInfos[target.meteorType].score
+
+
+def take_snapshot() -> tracemalloc.Snapshot:
+    # The harness's own bookkeeping and snapshots must not be counted as the bot's allocations
+    return tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__),
+                                                      tracemalloc.Filter(False, __file__)])
+
+
+def predict_hit(orientation: float, game_message: GameMessage,
+                claimed_meteor_ids: AbstractSet[str] = frozenset()) -> Optional[Meteor]:
+    # First meteor a rocket fired now would meet, assuming every meteor keeps a straight course. Claimed meteors
+    # were already destroyed by an earlier shot, so the rocket flies through them.
+    speed = game_message.constants.rockets.speed
+    p_rocket: Vector = game_message.cannon.position
+    v_rocket = Vector(x=speed * cos(radians(orientation)), y=speed * sin(radians(orientation)))
+    world = game_message.constants.world
+    max_time = sqrt(world.width ** 2 + world.height ** 2) / speed
+
+    first_hit, first_time = None, max_time
+    for meteor in game_message.meteors:
+        if meteor.id in claimed_meteor_ids:
+            continue
+        d_x, d_y = p_rocket.x - meteor.position.x, p_rocket.y - meteor.position.y
+        dv_x, dv_y = v_rocket.x - meteor.velocity.x, v_rocket.y - meteor.velocity.y
+        closing = dv_x ** 2 + dv_y ** 2
+        mintime = max(0.0, -(d_x * dv_x + d_y * dv_y) / closing) if closing else 0.0
+        mindist = sqrt((d_x + mintime * dv_x) ** 2 + (d_y + mintime * dv_y) ** 2)
+        if mindist < meteor.size + game_message.constants.rockets.size and mintime < first_time:
+            first_hit, first_time = meteor, mintime
+    return first_hit
+
+
+def run_lockstep(bot_names: List[str], stream: Iterator[dict], trace_allocations: bool = False) -> List[BotRun]:
+    np.random.seed(0)
+    runs = [BotRun(name, trace_allocations) for name in bot_names]
+    if trace_allocations:
+        tracemalloc.start()
+    try:
+        for raw_message in stream:
+            for run in runs:
+                # Every bot gets its own copy so no implementation can see another's mutations
+                run.play(cattrs.structure(raw_message, GameMessage))
+    finally:
+        if trace_allocations:
+            tracemalloc.stop()
+    return runs
+
+
+def percentile(values: List[float], q: float) -> float:
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def format_report(runs: List[BotRun]) -> str:
+    rows = [
+        ("ticks", lambda run: f"{len(run.latencies)}"),
+        ("shots", lambda run: f"{run.shots}"),
+        ("distinct meteors hit", lambda run: f"{run.predicted_hits}"),
+        ("hit rate", lambda run: f"{round(100 * run.predicted_hits / run.shots, 1) if run.shots else 0.0}%"),
+        ("predicted score", lambda run: f"{round(run.predicted_score)}"),
+        ("latency mean (ms)", lambda run: f"{1000 * float(np.mean(run.latencies)) if run.latencies else 0.0:.3f}"),
+        ("latency p50 (ms)", lambda run: f"{1000 * percentile(run.latencies, 50):.3f}"),
+        ("latency p95 (ms)", lambda run: f"{1000 * percentile(run.latencies, 95):.3f}"),
+        ("latency p99 (ms)", lambda run: f"{1000 * percentile(run.latencies, 99):.3f}"),
+        ("latency max (ms)", lambda run: f"{1000 * max(run.latencies, default=0.0):.3f}"),
+    ]
+    if any(run.trace_allocations for run in runs):
+        rows += [
+            ("new blocks mean",
+             lambda run: f"{float(np.mean(run.allocated_blocks)) if run.allocated_blocks else 0.0:.1f}"),
+            ("new blocks max", lambda run: f"{max(run.allocated_blocks, default=0)}"),
+            ("alloc peak mean (KiB)",
+             lambda run: f"{float(np.mean(run.allocated)) / 1024 if run.allocated else 0.0:.1f}"),
+            ("alloc peak max (KiB)", lambda run: f"{max(run.allocated, default=0) / 1024:.1f}"),
+        ]
+
+    label_width = max(len(label) for label, _ in rows)
+    column_width = max(12, *(len(run.name) for run in runs))
+    lines = [" " * label_width + "".join(f" | {run.name:>{column_width}}" for run in runs)]
+    lines.append("-" * len(lines[0]))
+    for label, cell in rows:
+        lines.append(f"{label:<{label_width}}" + "".join(f" | {cell(run):>{column_width}}" for run in runs))
+    lines.append("")
+    lines.append("Open-loop stream: meteors are never removed or split by the bots' own rockets. Each meteor is "
+                 "credited at most once per bot, to the first shot predicted to hit it.")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--bots", nargs="+", default=["old", "new"], choices=sorted(BOT_REGISTRY))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--ticks", type=int, default=1000)
+    parser.add_argument("--replay", help="Recorded game to replay instead of a seeded stream")
+    parser.add_argument("--allocations", action="store_true",
+                        help="Trace allocations in a second pass so that latencies are not skewed")
+    args = parser.parse_args()
+
+    def stream():
+        if args.replay:
+            return recorded_stream(args.replay)
+        return SceneGenerator(SceneConfig(seed=args.seed, ticks=args.ticks)).raw_messages()
+
+    runs = run_lockstep(args.bots, stream())
+    if args.allocations:
+        for run, traced_run in zip(runs, run_lockstep(args.bots, stream(), trace_allocations=True)):
+            run.trace_allocations = True
+            run.allocated = traced_run.allocated
+            run.allocated_blocks = traced_run.allocated_blocks
+    print(format_report(runs))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import numpy as np
+from typing import Dict, Optional, Tuple
+
+from game_message import MeteorType
+
+
+class UncertaintyEngine:
+    """Estimates the probability that a rocket aimed at a predicted child meteor actually hits it.
+
+    Child trajectories are sampled with jitter on the explosion angle and the child speed. The problem is solved in a
+    canonical frame where the nominal child velocity lies on the x axis, so that the result only depends on the
+    meteor types, the child travel time and the angle between the rocket and the child. Results are cached per
+    bucket of that geometry.
+    """
+
+    DEFAULT_ANGLE_JITTER: Dict[MeteorType, float] = {
+        MeteorType.Large: 3.0,
+        MeteorType.Medium: 6.0,
+        MeteorType.Small: 10.0,
+    }
+    DEFAULT_SPEED_JITTER: Dict[MeteorType, float] = {
+        MeteorType.Large: 0.05,
+        MeteorType.Medium: 0.1,
+        MeteorType.Small: 0.15,
+    }
+
+    def __init__(self, samples: int = 512, time_bucket: float = 2.0, angle_bucket: float = 5.0,
+                 angle_jitter: Optional[Dict[MeteorType, float]] = None,
+                 speed_jitter: Optional[Dict[MeteorType, float]] = None, seed: int = 0):
+        self.time_bucket = time_bucket
+        self.angle_bucket = angle_bucket
+        self.angle_jitter = angle_jitter or self.DEFAULT_ANGLE_JITTER
+        self.speed_jitter = speed_jitter or self.DEFAULT_SPEED_JITTER
+        # Same draws for every estimate so that decisions are reproducible and comparable between buckets
+        self.noise = np.random.default_rng(seed).standard_normal((2, samples))
+        self.cache: Dict[Tuple, float] = {}
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def hit_probability(self, parent_type: MeteorType, child_type: MeteorType, child_speed: float,
+                        travel_time: float, rocket_angle: float, rocket_speed: float, hit_distance: float) -> float:
+        """
+        :param travel_time: ticks between the explosion and the planned intercept
+        :param rocket_angle: angle in degrees between the rocket direction and the nominal child velocity
+        :param hit_distance: sum of the child meteor and rocket sizes
+        """
+        time_index = int(travel_time // self.time_bucket)
+        angle_index = int((rocket_angle % 360.0) // self.angle_bucket)
+        key = (parent_type, child_type, time_index, angle_index, child_speed, rocket_speed, hit_distance)
+        probability = self.cache.get(key)
+        if probability is not None:
+            self.hits += 1
+            return probability
+
+        self.misses += 1
+        probability = self._simulate(child_type, child_speed, (time_index + 0.5) * self.time_bucket,
+                                     np.radians((angle_index + 0.5) * self.angle_bucket), rocket_speed, hit_distance)
+        self.cache[key] = probability
+        return probability
+
+    def _simulate(self, child_type: MeteorType, child_speed: float, travel_time: float, rocket_angle: float,
+                  rocket_speed: float, hit_distance: float) -> float:
+        angles = np.radians(self.angle_jitter[child_type]) * self.noise[0]
+        speeds = child_speed * (1.0 + self.speed_jitter[child_type] * self.noise[1])
+
+        # Rocket flies through the nominal intercept point (child_speed * travel_time, 0) at travel_time
+        rocket_v_x = rocket_speed * np.cos(rocket_angle)
+        rocket_v_y = rocket_speed * np.sin(rocket_angle)
+        start_x = child_speed * travel_time - rocket_v_x * travel_time
+        start_y = -rocket_v_y * travel_time
+
+        # Closest approach between the rocket and every sampled child, both starting at the explosion time
+        relative_v_x = rocket_v_x - speeds * np.cos(angles)
+        relative_v_y = rocket_v_y - speeds * np.sin(angles)
+        closing = relative_v_x ** 2 + relative_v_y ** 2
+        mintime = np.maximum(0.0, -(start_x * relative_v_x + start_y * relative_v_y) / np.maximum(closing, 1e-12))
+        mindist = np.hypot(start_x + mintime * relative_v_x, start_y + mintime * relative_v_y)
+        return float(np.mean(mindist < hit_distance))
+
+    def report(self) -> str:
+        return f"Uncertainty engine: {len(self.cache)} buckets, {self.hits} cache hits, {self.misses} simulations"